@@ -1,8 +1,11 @@
+import hashlib
+import html
+import io
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy import stats
 import plotly.graph_objects as go
+from equity import equity_totals
 
 # Page config
 st.set_page_config(
@@ -35,16 +38,19 @@ st.markdown("""
 
 # Initialize session state
 def init_session_state():
-    if 'drafted_players' not in st.session_state:
-        st.session_state.drafted_players = set()
-    if 'my_roster' not in st.session_state:
-        st.session_state.my_roster = []
+    if 'drafted_mask' not in st.session_state:
+        st.session_state.drafted_mask = None
+    if 'roster_idx' not in st.session_state:
+        st.session_state.roster_idx = np.empty(20, dtype=np.int32)
+        st.session_state.roster_len = 0
     if 'finals_emphasis' not in st.session_state:
         st.session_state.finals_emphasis = 1.0
     if 'data_loaded' not in st.session_state:
         st.session_state.data_loaded = False
     if 'df' not in st.session_state:
         st.session_state.df = None
+    if '_live_emphasis' not in st.session_state:
+        st.session_state._live_emphasis = None
 
 init_session_state()
 
@@ -53,12 +59,9 @@ def process_data(df):
     if df is None:
         return None
     
-    # Ensure ID column exists
-    if 'ID' not in df.columns:
-        df['ID'] = range(len(df))
-    
     # Fill missing ADP values with high number (drafted last)
     if 'ADP' in df.columns:
+        df['ADP'] = pd.to_numeric(df['ADP'], errors='coerce')
         max_adp = df['ADP'].max()
         if pd.isna(max_adp):
             max_adp = 999
@@ -74,83 +77,172 @@ def process_data(df):
         'R2Games': 3,
         'R3Games': 3,
         'FinalsGames': 3,
-        'FinalAdjGPP': 0,
-        'ADP': 999
+        'FinalAdjGPP': 0.0,
+        'ADP': 999.0
     }
     
     for col, default_val in required_cols.items():
         if col not in df.columns:
             df[col] = default_val
         else:
-            # Fill NA values
-            df[col] = df[col].fillna(default_val)
+            # Coerce to numbers (bad cells become NA) and fill NA values
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(default_val)
     
     # Remove any rows where critical columns are still NA
     critical_cols = ['Name', 'Position', 'Team', 'FinalAdjGPP']
     df = df.dropna(subset=critical_cols)
     
     # Filter to only players with reasonable projections (remove outliers/bad data)
-    df = df[df['FinalAdjGPP'] > 0]
+    df = df[df['FinalAdjGPP'] > 0].reset_index(drop=True)
+    
+    # IDs are row positions so they index the drafted mask directly
+    df['ID'] = np.arange(len(df), dtype=np.int32)
+    
+    fa = df['FinalAdjGPP'].to_numpy(np.float64)
+    adp = df['ADP'].to_numpy(np.float64)
+    
+    # Calculate rankings ('min' ties: rank is 1 + number of strictly better values)
+    def min_rank(arr):
+        return (np.searchsorted(np.sort(arr), arr, side='left') + 1).astype(np.int16)
     
-    # Calculate rankings
-    df['FinalAdjGPP_Rank'] = df['FinalAdjGPP'].rank(ascending=False, method='min').astype(int)
-    df['ADP_Rank'] = df['ADP'].rank(ascending=True, method='min').astype(int)
+    df['FinalAdjGPP_Rank'] = min_rank(-fa)
+    df['ADP_Rank'] = min_rank(adp)
     df['ValueScore'] = df['ADP_Rank'] - df['FinalAdjGPP_Rank']
     
     # Calculate z-scores (handle potential all-same-value cases)
-    try:
-        df['zFinal'] = stats.zscore(df['FinalAdjGPP'])
-        df['zADP'] = stats.zscore(-df['ADP'])
-        df['ValueZ'] = df['zFinal'] - df['zADP']
-    except:
-        df['zFinal'] = 0
-        df['zADP'] = 0
-        df['ValueZ'] = 0
+    def zscore(arr):
+        std = arr.std()
+        return (arr - arr.mean()) / std if std > 0 else np.zeros_like(arr)
+    
+    df['zFinal'] = zscore(fa.astype(np.float32))
+    df['zADP'] = zscore(-adp.astype(np.float32))
+    df['ValueZ'] = df['zFinal'] - df['zADP']
+    
+    # Team rank tier code (see RANK_TIERS)
+    df['TierCode'] = np.digitize(df['TeamRank'].to_numpy(), [6, 11, 21]).astype(np.int8)
     
     # Value Alert flag
-    df['ValueAlert'] = ((df['ValueScore'] >= 12) | (df['ValueZ'] >= 0.75))
+    df.eval("ValueAlert = (ValueScore >= 12) | (ValueZ >= 0.75)", engine='numexpr', inplace=True)
+    
+    # Safety score (only depends on static projection columns)
+    df.eval(
+        "SafetyScore = FinalAdjGPP * 0.6 + (31 - TeamRank) * 10"
+        " + FinalsGames * 20 + (1 - ShutdownRisk) * 100",
+        engine='numexpr', inplace=True
+    )
+    
+    # Downcast to compact dtypes (low-cardinality strings become categoricals)
+    df['Team'] = df['Team'].astype('category')
+    df['Position'] = df['Position'].astype('category')
+    
+    for col in df.select_dtypes(include='float').columns:
+        df[col] = pd.to_numeric(df[col], downcast='float')
+    
+    # int16 rather than the smallest fit so score arithmetic can't overflow
+    for col in ['TeamRank', 'R2Games', 'R3Games', 'FinalsGames']:
+        if pd.api.types.is_numeric_dtype(df[col]) and (df[col] % 1 == 0).all():
+            df[col] = df[col].astype(np.int16)
     
     return df
 
+# Columns read from each sheet; anything else in the workbook is skipped
+DRAFT_BOARD_COLS = ['Name', 'Position', 'Team', 'ADP', 'TeamRank', 'R2Games', 'R3Games', 'FinalsGames',
+                    'R2Mult', 'R3Mult', 'FinalsMult', 'FinalAdjGPP', 'ShutdownRisk']
+ENV_COLS = ['Team', 'R2Mult', 'R3Mult', 'FinalsMult']
+TEAM_COLS = ['Team', 'TeamRank']
+
+# Team rank tiers by TierCode (None shows every tier)
+RANK_TIERS = {
+    None: "All",
+    0: "1-5 (Elite)",
+    1: "6-10 (Good)",
+    2: "11-20 (Mid)",
+    3: "21-30 (Weak)",
+}
+
+# Player table columns, in display order
+FULL_DISPLAY_COLS = ['Name', 'Position', 'Team', 'ADP', 'TeamRank',
+                     'R2Games', 'R3Games', 'FinalsGames',
+                     'FinalAdjGPP', 'FinalAdjGPP_Rank', 'ADP_Rank',
+                     'ValueScore', 'ValueZ', 'LiveScore', 'ValueAlert']
+
+# Display-time formatting for the player table (the underlying data is never rounded)
+PLAYER_COLUMN_CONFIG = {
+    "ValueAlert": st.column_config.CheckboxColumn("🚨 Value"),
+    "ValueScore": st.column_config.NumberColumn("Value Score", help="ADP_Rank - FinalAdjGPP_Rank", format="%d"),
+    "ValueZ": st.column_config.NumberColumn("Value Z", help="Z-score based value metric", format="%.2f"),
+    "ADP": st.column_config.NumberColumn(format="%.1f"),
+    "FinalAdjGPP": st.column_config.NumberColumn(format="%.1f"),
+    "LiveScore": st.column_config.NumberColumn(format="%.1f"),
+    "R2Mult": st.column_config.NumberColumn(format="%.3f"),
+    "R3Mult": st.column_config.NumberColumn(format="%.3f"),
+    "FinalsMult": st.column_config.NumberColumn(format="%.3f"),
+}
+
+@st.cache_data(show_spinner=False)
+def load_and_process(file_bytes, name):
+    """Load the uploaded file and return the processed dataframe"""
+    if name.endswith('.csv'):
+        df = pd.read_csv(io.BytesIO(file_bytes), usecols=lambda c: c in DRAFT_BOARD_COLS)
+    else:
+        # Open the workbook once and parse each sheet from it
+        xl = pd.ExcelFile(io.BytesIO(file_bytes), engine='calamine')
+        
+        # Try to load Excel with required sheets
+        df = xl.parse('Draft Board (values)', usecols=lambda c: c in DRAFT_BOARD_COLS)
+        
+        # Try to load multipliers
+        try:
+            env_df = xl.parse('Week Environment (actual)', usecols=lambda c: c in ENV_COLS)
+            existing_mult_cols = [col for col in ENV_COLS[1:] if col in env_df.columns]
+            if existing_mult_cols:
+                mults = env_df.drop_duplicates('Team').set_index('Team')[existing_mult_cols]
+                # Use env values if they exist
+                for col in existing_mult_cols:
+                    df[col] = df['Team'].map(mults[col]).fillna(df.get(col, 1.0))
+        except Exception as e:
+            st.warning(f"Could not load 'Week Environment' sheet: {e}. Using default multipliers.")
+        
+        # Try to load team rankings
+        try:
+            team_df = xl.parse('Team Schedule (actual)', usecols=lambda c: c in TEAM_COLS)
+            if 'TeamRank' in team_df.columns:
+                if 'TeamRank' not in df.columns or df['TeamRank'].isna().all():
+                    ranks = team_df.drop_duplicates('Team').set_index('Team')['TeamRank']
+                    df['TeamRank'] = df['Team'].map(ranks)
+        except Exception as e:
+            st.warning(f"Could not load 'Team Schedule' sheet: {e}. Using default rankings.")
+    
+    return process_data(df)
+
+@st.cache_data(show_spinner=False)
+def live_score_values(df_hash, emphasis, _final_adj_gpp):
+    """LiveScore values for a loaded file at a given finals emphasis"""
+    return _final_adj_gpp * emphasis
+
 def calculate_live_score(df, emphasis):
     """Calculate LiveScore based on finals emphasis"""
-    df['LiveScore'] = df['FinalAdjGPP'] * emphasis
+    if emphasis == 1.0:
+        df['LiveScore'] = df['FinalAdjGPP']
+        return df
+    df['LiveScore'] = live_score_values(st.session_state.df_hash, emphasis, df['FinalAdjGPP'].to_numpy())
     return df
 
-def calculate_stack_score(player_row, my_roster_df):
-    """Calculate stack score for a potential pick"""
-    score = 0
-    
+def calculate_stack_score(players_df, my_roster_df):
+    """Calculate stack scores for all potential picks"""
     if my_roster_df.empty:
-        return score
+        return np.zeros(len(players_df), dtype=int)
     
-    player_team = player_row['Team']
-    team_count = len(my_roster_df[my_roster_df['Team'] == player_team])
+    team_counts = my_roster_df['Team'].value_counts()
+    tc = players_df['Team'].astype(object).map(team_counts).fillna(0).to_numpy()
     
     # Stack bonuses
-    if team_count == 1:
-        score += 6
-    elif team_count == 2:
-        score += 10
+    score = np.where(tc == 1, 6, np.where(tc == 2, 10, 0))
     
     # Team quality bonuses
-    try:
-        if float(player_row['TeamRank']) <= 10:
-            score += 3
-    except:
-        pass
-    
-    try:
-        if int(player_row['FinalsGames']) == 4:
-            score += 4
-    except:
-        pass
-    
-    try:
-        if float(player_row['FinalsMult']) >= 1.04:
-            score += 2
-    except:
-        pass
+    score += np.where(players_df['TeamRank'].to_numpy() <= 10, 3, 0)
+    score += np.where(players_df['FinalsGames'].to_numpy() == 4, 4, 0)
+    score += np.where(players_df['FinalsMult'].to_numpy() >= 1.04, 2, 0)
     
     return score
 
@@ -160,54 +252,81 @@ def calculate_equity(roster_df):
         return 0, 0
     
     try:
-        advance_equity = (roster_df['R2Games'] * roster_df['R2Mult'] * 1.0 + 
-                         roster_df['R3Games'] * roster_df['R3Mult'] * 1.35).sum()
-        
-        win_equity = (roster_df['FinalsGames'] * roster_df['FinalsMult'] * 1.75).sum()
-        
-        return advance_equity, win_equity
+        cols = ['R2Games', 'R2Mult', 'R3Games', 'R3Mult', 'FinalsGames', 'FinalsMult']
+        advance_equity, win_equity = equity_totals(*(roster_df[col].to_numpy(np.float32) for col in cols))
+        # Columns are float32/int16; hand Streamlit (st.progress) plain Python floats
+        return float(advance_equity), float(win_equity)
     except:
         return 0, 0
 
+def top_k(df, col, k):
+    """Return the k rows with the largest values in col, best first"""
+    neg = -df[col].to_numpy(dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(neg))
+    if k >= len(valid):
+        # Everything non-NaN is picked; nlargest pads with NaN rows in row order
+        nan_rows = np.flatnonzero(np.isnan(neg))[:k - len(valid)]
+        return df.iloc[np.concatenate([valid[np.argsort(neg[valid], kind='stable')], nan_rows])]
+    # Keep every row tied at the k-th value, then a stable sort takes the earliest (nlargest keep='first')
+    thr = np.partition(neg, k - 1)[k - 1]
+    cand = np.flatnonzero(neg <= thr)
+    return df.iloc[cand[np.argsort(neg[cand], kind='stable')][:k]]
+
+def recommend(available_df, my_roster_df):
+    """Top value, stack and safety picks from the available players"""
+    available_df['StackScore'] = calculate_stack_score(available_df, my_roster_df)
+    return {
+        'value': top_k(available_df, 'ValueZ', 5)[
+            ['Name', 'Position', 'Team', 'ValueZ', 'ValueScore', 'LiveScore', 'ADP']
+        ],
+        'stack': top_k(available_df, 'StackScore', 3)[
+            ['Name', 'Position', 'Team', 'StackScore', 'TeamRank', 'FinalsGames', 'LiveScore']
+        ],
+        'safe': top_k(available_df, 'SafetyScore', 3)[
+            ['Name', 'Position', 'Team', 'SafetyScore', 'TeamRank', 'ShutdownRisk', 'LiveScore']
+        ],
+    }
+
+def is_drafted(df):
+    """Boolean mask of drafted players for a slice of the loaded dataframe"""
+    return st.session_state.drafted_mask[df.index.to_numpy()]
+
+def roster_positions():
+    """Row positions of my roster, in draft order"""
+    return st.session_state.roster_idx[:st.session_state.roster_len]
+
+def add_to_roster(pos):
+    """Append a row position to my roster, growing the buffer when full"""
+    if st.session_state.roster_len == len(st.session_state.roster_idx):
+        st.session_state.roster_idx = np.resize(st.session_state.roster_idx, 2 * st.session_state.roster_len)
+    st.session_state.roster_idx[st.session_state.roster_len] = pos
+    st.session_state.roster_len += 1
+
+def is_rostered(df):
+    """Boolean mask of my roster players for a slice of the loaded dataframe"""
+    in_roster = np.zeros(len(st.session_state.drafted_mask), dtype=bool)
+    in_roster[roster_positions()] = True
+    return in_roster[df.index.to_numpy()]
+
 def display_player_table(df, show_drafted=False, show_available=True, show_my_roster=False):
     """Display the main player table with filtering"""
     
     # Filter based on view mode
     if show_my_roster:
-        display_df = df[df['ID'].isin(st.session_state.my_roster)]
+        display_df = df[is_rostered(df)]
     elif show_drafted:
-        display_df = df[df['ID'].isin(st.session_state.drafted_players)]
+        display_df = df[is_drafted(df)]
     elif show_available:
-        display_df = df[~df['ID'].isin(st.session_state.drafted_players)]
+        display_df = df[~is_drafted(df)]
     else:
-        display_df = df.copy()
+        display_df = df
     
     if display_df.empty:
         st.info("No players match the current filters.")
         return None
     
-    # Select columns to display
-    base_cols = ['Name', 'Position', 'Team', 'ADP', 'TeamRank', 
-                 'R2Games', 'R3Games', 'FinalsGames',
-                 'FinalAdjGPP', 'FinalAdjGPP_Rank', 'ADP_Rank', 
-                 'ValueScore', 'ValueZ', 'LiveScore', 'ValueAlert']
-    
-    # Only include columns that exist
-    display_cols = [col for col in base_cols if col in display_df.columns]
-    
-    # Format the dataframe
-    styled_df = display_df[display_cols].copy()
-    
-    # Format numeric columns safely
-    for col in ['ADP', 'R2Mult', 'R3Mult', 'FinalsMult', 'FinalAdjGPP', 'LiveScore']:
-        if col in styled_df.columns:
-            styled_df[col] = pd.to_numeric(styled_df[col], errors='coerce').round(1)
-    
-    if 'ValueScore' in styled_df.columns:
-        styled_df['ValueScore'] = pd.to_numeric(styled_df['ValueScore'], errors='coerce').fillna(0).astype(int)
-    
-    if 'ValueZ' in styled_df.columns:
-        styled_df['ValueZ'] = pd.to_numeric(styled_df['ValueZ'], errors='coerce').round(2)
+    # Columns to display (resolved against the loaded data once, at upload)
+    styled_df = display_df[st.session_state.display_cols]
     
     # Display with clickable rows
     st.dataframe(
@@ -215,15 +334,38 @@ def display_player_table(df, show_drafted=False, show_available=True, show_my_ro
         use_container_width=True,
         height=600,
         hide_index=True,
-        column_config={
-            "ValueAlert": st.column_config.CheckboxColumn("🚨 Value"),
-            "ValueScore": st.column_config.NumberColumn("Value Score", help="ADP_Rank - FinalAdjGPP_Rank"),
-            "ValueZ": st.column_config.NumberColumn("Value Z", help="Z-score based value metric"),
-        }
+        column_config=PLAYER_COLUMN_CONFIG
     )
     
     return display_df
 
+@st.cache_data(show_spinner=False)
+def compute_team_summary(roster_key, df_hash, _df, _team_meta):
+    """Team breakdown for the roster rows in roster_key (cached per roster and file)"""
+    counts = _df.iloc[list(roster_key)]['Team'].value_counts()
+    counts = counts[counts > 0].rename('Count')
+    team_summary = _team_meta.join(counts, how='inner').reset_index()
+    team_summary = team_summary[['Team', 'Count', 'TeamRank', 'R2Games', 'R3Games', 'FinalsGames']]
+    return team_summary.sort_values('Count', ascending=False)
+
+@st.cache_data(show_spinner=False)
+def build_position_fig(position_counts):
+    """Players-by-position bar chart from (position, count) pairs"""
+    positions, counts = zip(*position_counts)
+    
+    fig = go.Figure(data=[
+        go.Bar(x=list(positions), y=list(counts),
+              marker_color='#1f77b4')
+    ])
+    fig.update_layout(
+        title="Players by Position",
+        xaxis_title="Position",
+        yaxis_title="Count",
+        template="plotly_dark",
+        height=300
+    )
+    return fig
+
 def main():
     st.title("🏀 DraftKings NBA Best Ball Draft Assistant")
     st.subheader("Shootaround Tournament Optimizer")
@@ -257,46 +399,28 @@ def main():
         if uploaded_file is not None:
             try:
                 with st.spinner("Loading data..."):
-                    if uploaded_file.name.endswith('.csv'):
-                        df = pd.read_csv(uploaded_file)
-                    else:
-                        # Try to load Excel with required sheets
-                        df = pd.read_excel(uploaded_file, sheet_name='Draft Board (values)')
-                        
-                        # Try to load multipliers
-                        try:
-                            env_df = pd.read_excel(uploaded_file, sheet_name='Week Environment (actual)')
-                            mult_cols = ['Team', 'R2Mult', 'R3Mult', 'FinalsMult']
-                            existing_mult_cols = [col for col in mult_cols if col in env_df.columns]
-                            if existing_mult_cols:
-                                df = df.merge(env_df[existing_mult_cols], on='Team', how='left', suffixes=('', '_env'))
-                                # Use env values if they exist
-                                for col in ['R2Mult', 'R3Mult', 'FinalsMult']:
-                                    if f'{col}_env' in df.columns:
-                                        df[col] = df[f'{col}_env'].fillna(df.get(col, 1.0))
-                                        df = df.drop(columns=[f'{col}_env'])
-                        except Exception as e:
-                            st.warning(f"Could not load 'Week Environment' sheet: {e}. Using default multipliers.")
-                        
-                        # Try to load team rankings
-                        try:
-                            team_df = pd.read_excel(uploaded_file, sheet_name='Team Schedule (actual)')
-                            if 'TeamRank' in team_df.columns:
-                                if 'TeamRank' not in df.columns or df['TeamRank'].isna().all():
-                                    df = df.drop(columns=['TeamRank'], errors='ignore')
-                                    df = df.merge(team_df[['Team', 'TeamRank']], on='Team', how='left')
-                        except Exception as e:
-                            st.warning(f"Could not load 'Team Schedule' sheet: {e}. Using default rankings.")
-                    
-                    # Process and store data
-                    df = process_data(df)
+                    file_bytes = uploaded_file.getvalue()
+                    df = load_and_process(file_bytes, uploaded_file.name)
                     
                     if df is None or len(df) == 0:
                         st.error("No valid data found after processing. Please check your file.")
                         return
                     
+                    st.session_state.df_hash = hashlib.sha1(file_bytes).hexdigest()
+                    df = calculate_live_score(df, st.session_state.finals_emphasis)
+                    st.session_state._live_emphasis = st.session_state.finals_emphasis
+                    
                     st.session_state.df = df
                     st.session_state.data_loaded = True
+                    st.session_state.drafted_mask = np.zeros(len(df), dtype=bool)
+                    st.session_state.unique_positions = df['Position'].cat.categories.tolist()
+                    st.session_state.unique_teams = df['Team'].cat.categories.tolist()
+                    st.session_state.unique_finals_games = sorted(df['FinalsGames'].unique().tolist())
+                    st.session_state.name_lc = df['Name'].astype(str).str.lower().to_numpy(dtype=str)
+                    st.session_state.team_meta = df.drop_duplicates('Team').set_index('Team')[
+                        ['TeamRank', 'R2Games', 'R3Games', 'FinalsGames']
+                    ]
+                    st.session_state.display_cols = [col for col in FULL_DISPLAY_COLS if col in df.columns]
                     st.success(f"✅ Data loaded successfully! {len(df)} players ready.")
                     st.rerun()
                 
@@ -319,7 +443,6 @@ def main():
     
     # Data is loaded, show the app
     df = st.session_state.df
-    df = calculate_live_score(df, st.session_state.finals_emphasis)
     
     # Sidebar controls
     with st.sidebar:
@@ -329,8 +452,9 @@ def main():
         if st.button("📤 Upload New Data", use_container_width=True):
             st.session_state.df = None
             st.session_state.data_loaded = False
-            st.session_state.drafted_players = set()
-            st.session_state.my_roster = []
+            st.session_state._live_emphasis = None
+            st.session_state.drafted_mask = None
+            st.session_state.roster_len = 0
             st.rerun()
         
         st.divider()
@@ -347,6 +471,11 @@ def main():
         )
         st.session_state.finals_emphasis = finals_emphasis
         
+        # Rebuild LiveScore only when the slider actually moved
+        if st.session_state._live_emphasis != finals_emphasis:
+            df = calculate_live_score(df, finals_emphasis)
+            st.session_state._live_emphasis = finals_emphasis
+        
         st.divider()
         
         # View Mode
@@ -363,21 +492,22 @@ def main():
         st.subheader("🔍 Filters")
         
         # Position filter
-        positions = ['All'] + sorted(df['Position'].unique().tolist())
+        positions = ['All'] + st.session_state.unique_positions
         position_filter = st.multiselect("Position", positions, default=['All'])
         
         # Team filter
-        teams = ['All'] + sorted(df['Team'].unique().tolist())
+        teams = ['All'] + st.session_state.unique_teams
         team_filter = st.multiselect("Team", teams, default=['All'])
         
         # TeamRank tier filter
         rank_tier = st.selectbox(
             "Team Rank Tier",
-            ["All", "1-5 (Elite)", "6-10 (Good)", "11-20 (Mid)", "21-30 (Weak)"]
+            list(RANK_TIERS),
+            format_func=RANK_TIERS.get
         )
         
         # Finals games filter
-        unique_finals = sorted(df['FinalsGames'].unique().tolist())
+        unique_finals = st.session_state.unique_finals_games
         finals_games_filter = st.multiselect(
             "Finals Games",
             unique_finals,
@@ -393,53 +523,51 @@ def main():
         st.subheader("🎯 Draft Actions")
         
         if st.button("🔄 Reset Draft", use_container_width=True):
-            st.session_state.drafted_players = set()
-            st.session_state.my_roster = []
+            st.session_state.drafted_mask = np.zeros(len(df), dtype=bool)
+            st.session_state.roster_len = 0
             st.rerun()
         
         if st.button("↩️ Undo Last Pick", use_container_width=True):
-            if st.session_state.my_roster:
-                last_pick = st.session_state.my_roster.pop()
-                st.session_state.drafted_players.discard(last_pick)
+            if st.session_state.roster_len:
+                st.session_state.roster_len -= 1
+                last_pick = st.session_state.roster_idx[st.session_state.roster_len]
+                st.session_state.drafted_mask[last_pick] = False
                 st.rerun()
         
         st.divider()
         
         # Roster summary
         st.subheader("👥 My Roster")
-        st.metric("Players Drafted", len(st.session_state.my_roster))
+        st.metric("Players Drafted", st.session_state.roster_len)
         
-        if st.session_state.my_roster:
-            my_roster_df = df[df['ID'].isin(st.session_state.my_roster)]
+        if st.session_state.roster_len:
+            my_roster_df = df.iloc[roster_positions()]
             advance_eq, win_eq = calculate_equity(my_roster_df)
             
             st.metric("Advance Equity", f"{advance_eq:.1f}")
             st.metric("Win Equity", f"{win_eq:.1f}")
     
-    # Apply filters
-    filtered_df = df.copy()
+    # Apply filters as a single fused query
+    clauses = []
     
     if 'All' not in position_filter and position_filter:
-        filtered_df = filtered_df[filtered_df['Position'].isin(position_filter)]
+        clauses.append("Position in @position_filter")
     
     if 'All' not in team_filter and team_filter:
-        filtered_df = filtered_df[filtered_df['Team'].isin(team_filter)]
-    
-    if rank_tier != "All":
-        if rank_tier == "1-5 (Elite)":
-            filtered_df = filtered_df[filtered_df['TeamRank'] <= 5]
-        elif rank_tier == "6-10 (Good)":
-            filtered_df = filtered_df[(filtered_df['TeamRank'] >= 6) & (filtered_df['TeamRank'] <= 10)]
-        elif rank_tier == "11-20 (Mid)":
-            filtered_df = filtered_df[(filtered_df['TeamRank'] >= 11) & (filtered_df['TeamRank'] <= 20)]
-        elif rank_tier == "21-30 (Weak)":
-            filtered_df = filtered_df[filtered_df['TeamRank'] >= 21]
+        clauses.append("Team in @team_filter")
+    
+    if rank_tier is not None:
+        clauses.append("TierCode == @rank_tier")
     
     if finals_games_filter:
-        filtered_df = filtered_df[filtered_df['FinalsGames'].isin(finals_games_filter)]
+        clauses.append("FinalsGames in @finals_games_filter")
+    
+    # Without active filters the loaded frame is used as-is; nothing downstream mutates it
+    filtered_df = df.query(" and ".join(clauses), engine='numexpr') if clauses else df
     
     if search_term:
-        filtered_df = filtered_df[filtered_df['Name'].str.contains(search_term, case=False, na=False)]
+        names_lc = st.session_state.name_lc[filtered_df.index.to_numpy()]
+        filtered_df = filtered_df[np.char.find(names_lc, search_term.lower()) >= 0]
     
     # Main content tabs
     tab1, tab2, tab3 = st.tabs(["📊 Draft Board", "⏰ On The Clock", "📈 Analytics"])
@@ -469,9 +597,11 @@ def main():
             col1, col2, col3 = st.columns([2, 1, 1])
             
             with col1:
-                available_players = display_df[~display_df['ID'].isin(st.session_state.drafted_players)]
-                player_options = {f"{row['Name']} ({row['Position']}, {row['Team']})": row['ID'] 
-                                for _, row in available_players.iterrows()}
+                available_players = display_df[~is_drafted(display_df)]
+                labels = (available_players['Name'].astype(str) + ' (' +
+                          available_players['Position'].astype(str) + ', ' +
+                          available_players['Team'].astype(str) + ')').to_numpy()
+                player_options = dict(zip(labels, available_players['ID'].to_numpy()))
                 
                 if player_options:
                     selected_player = st.selectbox(
@@ -483,101 +613,80 @@ def main():
             with col2:
                 if player_options and st.button("Draft to My Team", use_container_width=True):
                     player_id = player_options[selected_player]
-                    st.session_state.drafted_players.add(player_id)
-                    st.session_state.my_roster.append(player_id)
+                    st.session_state.drafted_mask[player_id] = True
+                    add_to_roster(player_id)
                     st.success(f"✅ Drafted {selected_player}")
                     st.rerun()
             
             with col3:
                 if player_options and st.button("Mark as Drafted", use_container_width=True):
                     player_id = player_options[selected_player]
-                    st.session_state.drafted_players.add(player_id)
+                    st.session_state.drafted_mask[player_id] = True
                     st.info(f"Marked {selected_player} as drafted")
                     st.rerun()
     
     with tab2:
         st.subheader("⏰ On The Clock - Recommendations")
         
-        available_df = filtered_df[~filtered_df['ID'].isin(st.session_state.drafted_players)].copy()
+        available_df = filtered_df[~is_drafted(filtered_df)].copy()
         
         if available_df.empty:
             st.warning("No players available matching current filters.")
         else:
-            my_roster_df = df[df['ID'].isin(st.session_state.my_roster)]
-            available_df['StackScore'] = available_df.apply(
-                lambda row: calculate_stack_score(row, my_roster_df), axis=1
-            )
-            
-            available_df['SafetyScore'] = (
-                available_df['FinalAdjGPP'] * 0.6 +
-                (31 - available_df['TeamRank']) * 10 +
-                available_df['FinalsGames'] * 20 +
-                (1 - available_df['ShutdownRisk']) * 100
-            )
+            my_roster_df = df.iloc[roster_positions()]
+            picks = recommend(available_df, my_roster_df)
             
             col1, col2, col3 = st.columns(3)
             
+            # Each panel is rendered as a single markdown block
             with col1:
                 st.markdown("### 🎯 Best Value Picks")
-                value_picks = available_df.nlargest(5, 'ValueZ')[
-                    ['Name', 'Position', 'Team', 'ValueZ', 'ValueScore', 'LiveScore', 'ADP']
-                ].head(5)
-                
-                for idx, row in value_picks.iterrows():
-                    with st.container():
-                        st.markdown(f"**{row['Name']}** ({row['Position']}, {row['Team']})")
-                        st.write(f"ValueZ: {row['ValueZ']:.2f} | Value: {row['ValueScore']} | ADP: {row['ADP']:.1f}")
-                        st.write(f"LiveScore: {row['LiveScore']:.1f}")
-                        st.divider()
+                cards = [
+                    f"**{row.Name}** ({row.Position}, {row.Team})\n\n"
+                    f"ValueZ: {row.ValueZ:.2f} | Value: {row.ValueScore} | ADP: {row.ADP:.1f}\n\n"
+                    f"LiveScore: {row.LiveScore:.1f}\n\n---"
+                    for row in picks['value'].itertuples(index=False)
+                ]
+                st.markdown("\n\n".join(cards))
             
             with col2:
                 st.markdown("### 🔗 Best Stack Picks")
-                stack_picks = available_df.nlargest(3, 'StackScore')[
-                    ['Name', 'Position', 'Team', 'StackScore', 'TeamRank', 'FinalsGames', 'LiveScore']
-                ].head(3)
-                
-                for idx, row in stack_picks.iterrows():
-                    with st.container():
-                        st.markdown(f"**{row['Name']}** ({row['Position']}, {row['Team']})")
-                        st.write(f"Stack Score: {row['StackScore']:.0f} | TeamRank: {row['TeamRank']:.0f}")
-                        st.write(f"Finals Games: {row['FinalsGames']:.0f} | LiveScore: {row['LiveScore']:.1f}")
-                        
-                        team_count = len(my_roster_df[my_roster_df['Team'] == row['Team']])
-                        if team_count > 0:
-                            st.markdown(f"<span class='stack-badge'>Creates {team_count+1}-man stack!</span>", 
-                                      unsafe_allow_html=True)
-                        st.divider()
+                roster_team_counts = my_roster_df['Team'].value_counts()
+                cards = []
+                for row in picks['stack'].itertuples(index=False):
+                    card = (
+                        # This block renders as HTML, so escape the uploaded text fields
+                        f"**{html.escape(str(row.Name))}** "
+                        f"({html.escape(str(row.Position))}, {html.escape(str(row.Team))})\n\n"
+                        f"Stack Score: {row.StackScore:.0f} | TeamRank: {row.TeamRank:.0f}\n\n"
+                        f"Finals Games: {row.FinalsGames:.0f} | LiveScore: {row.LiveScore:.1f}\n\n"
+                    )
+                    team_count = roster_team_counts.get(row.Team, 0)
+                    if team_count > 0:
+                        card += f"<span class='stack-badge'>Creates {team_count+1}-man stack!</span>\n\n"
+                    cards.append(card + "---")
+                st.markdown("\n\n".join(cards), unsafe_allow_html=True)
             
             with col3:
                 st.markdown("### 🛡️ Safest Picks")
-                safe_picks = available_df.nlargest(3, 'SafetyScore')[
-                    ['Name', 'Position', 'Team', 'SafetyScore', 'TeamRank', 'ShutdownRisk', 'LiveScore']
-                ].head(3)
-                
-                for idx, row in safe_picks.iterrows():
-                    with st.container():
-                        st.markdown(f"**{row['Name']}** ({row['Position']}, {row['Team']})")
-                        st.write(f"Safety: {row['SafetyScore']:.1f} | TeamRank: {row['TeamRank']:.0f}")
-                        st.write(f"Shutdown Risk: {row['ShutdownRisk']:.2%}")
-                        st.write(f"LiveScore: {row['LiveScore']:.1f}")
-                        st.divider()
+                cards = [
+                    f"**{row.Name}** ({row.Position}, {row.Team})\n\n"
+                    f"Safety: {row.SafetyScore:.1f} | TeamRank: {row.TeamRank:.0f}\n\n"
+                    f"Shutdown Risk: {row.ShutdownRisk:.2%}\n\n"
+                    f"LiveScore: {row.LiveScore:.1f}\n\n---"
+                    for row in picks['safe'].itertuples(index=False)
+                ]
+                st.markdown("\n\n".join(cards))
     
     with tab3:
         st.subheader("📈 Team Exposure & Analytics")
         
-        if st.session_state.my_roster:
-            my_roster_df = df[df['ID'].isin(st.session_state.my_roster)]
+        if st.session_state.roster_len:
+            my_roster_df = df.iloc[roster_positions()]
             
             st.markdown("#### Team Breakdown")
-            team_summary = my_roster_df.groupby('Team').agg({
-                'Name': 'count',
-                'TeamRank': 'first',
-                'R2Games': 'first',
-                'R3Games': 'first',
-                'FinalsGames': 'first'
-            }).reset_index()
-            team_summary.columns = ['Team', 'Count', 'TeamRank', 'R2Games', 'R3Games', 'FinalsGames']
-            team_summary = team_summary.sort_values('Count', ascending=False)
+            roster_key = tuple(sorted(roster_positions().tolist()))
+            team_summary = compute_team_summary(roster_key, st.session_state.df_hash, df, st.session_state.team_meta)
             
             st.dataframe(team_summary, use_container_width=True, hide_index=True)
             
@@ -598,21 +707,10 @@ def main():
                 st.caption("Target: ~250-300 for championship equity")
             
             st.markdown("#### Position Breakdown")
-            pos_breakdown = my_roster_df['Position'].value_counts().reset_index()
-            pos_breakdown.columns = ['Position', 'Count']
-            
-            fig = go.Figure(data=[
-                go.Bar(x=pos_breakdown['Position'], y=pos_breakdown['Count'],
-                      marker_color='#1f77b4')
-            ])
-            fig.update_layout(
-                title="Players by Position",
-                xaxis_title="Position",
-                yaxis_title="Count",
-                template="plotly_dark",
-                height=300
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            pos_counts = my_roster_df['Position'].value_counts()
+            position_counts = tuple((str(pos), int(n)) for pos, n in pos_counts[pos_counts > 0].items())
+            fig = build_position_fig(position_counts)
+            st.plotly_chart(fig, use_container_width=True, config={'staticPlot': True})
             
         else:
             st.info("Draft some players to see analytics!")
@@ -0,0 +1,29 @@
+"""Roster equity kernel.
+
+Kept out of app_web.py because Streamlit re-executes the main script on every
+rerun; as an imported module the jitted function is built once per process.
+"""
+import numpy as np
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(cache=True)
+    def equity_totals(r2g, r2m, r3g, r3m, fg, fm):
+        """Accumulate advance and win equity over roster column arrays"""
+        advance_equity = 0.0
+        win_equity = 0.0
+        for i in range(r2g.shape[0]):
+            advance_equity += r2g[i] * r2m[i] + r3g[i] * r3m[i] * 1.35
+            win_equity += fg[i] * fm[i] * 1.75
+        return advance_equity, win_equity
+else:
+    def equity_totals(r2g, r2m, r3g, r3m, fg, fm):
+        """Accumulate advance and win equity over roster column arrays"""
+        # Python floats, matching what the jitted loop returns
+        return float(np.dot(r2g, r2m) + 1.35 * np.dot(r3g, r3m)), float(1.75 * np.dot(fg, fm))
+
+# Compile (or load the cached build) once per process, on first import
+equity_totals(*[np.ones(1, dtype=np.float32)] * 6)